@@ -5,6 +5,14 @@ CLS
 :: =================================================================
 ::  Builds both a single-file Portable and a full Installer version.
 ::  Must be run from the project's root directory.
+::  Optional: on x86 build machines with SSE4/AVX2 (check CPU-Z, or
+::  'grep sse4 /proc/cpuinfo' on Linux), Pillow-SIMD can replace Pillow
+::  for faster resizing in the bundled app. It is not a one-line swap:
+::  pillow-simd publishes no Windows wheels, so 'pip install pillow-simd'
+::  compiles it from source and needs the MSVC build tools plus the
+::  libjpeg and zlib headers and libraries set up first. Once it builds,
+::  run 'pip uninstall -y pillow' before installing it.
+::  Keep stock Pillow on ARM. No code changes are needed either way.
 :: =================================================================
 
 ECHO #############################################################
@@ -19,6 +27,16 @@ IF "%ProjectRoot:~-1%"=="\" SET "ProjectRoot=%ProjectRoot:~0,-1%"
 ECHO Project Root Directory is: "%ProjectRoot%"
 ECHO.
 
+:: Optional: tools\cjpegli.exe (jpegli) is bundled with the other tools when
+:: present. Only this bundled copy is ever used, never one found on PATH, and
+:: the app checks its argument form on first use, falling back to cjpeg.exe.
+IF EXIST "%ProjectRoot%\tools\cjpegli.exe" (
+    ECHO Bundling optional tools\cjpegli.exe for JPEG encoding.
+) ELSE (
+    ECHO tools\cjpegli.exe not found: JPEG encoding will use cjpeg.exe only.
+)
+ECHO.
+
 :: --- 1. Cleanup Phase ---
 ECHO [Phase 1/5] Cleaning up previous builds...
 IF EXIST "%ProjectRoot%\build" RMDIR /S /Q "%ProjectRoot%\build"
@@ -50,6 +68,11 @@ ECHO    Portable build successful.
 ECHO.
 
 :: --- 3. Build Folder Version (for Installer) ---
+:: The folder (--onedir) build starts faster than the portable --onefile exe,
+:: which unpacks itself to a temp folder on every launch. Nuitka is an
+:: alternative for this folder build with a faster cold start:
+::   python -m nuitka --standalone --enable-plugin=tk-inter --windows-disable-console src\compressor.py
+:: (tools\ must then be copied next to the output exe.)
 ECHO [Phase 3/5] Building Folder Version for the installer...
 IF EXIST "%ProjectRoot%\build" RMDIR /S /Q "%ProjectRoot%\build"
 IF EXIST "%ProjectRoot%\compressor.spec" DEL "%ProjectRoot%\compressor.spec" > NUL 2>&1
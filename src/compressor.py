@@ -2,25 +2,43 @@ import sys
 import os
 import subprocess
 import shutil
+import stat
 import tempfile
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
 import ctypes
 import threading
+import time
 import logging
-import uuid
+import itertools
+import io
+import mmap
+import atexit
+import multiprocessing
+import queue
+from functools import lru_cache
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # --- Conditional Logging Setup ---
 _HAS_ERROR_OCCURRED = False
+_LOG_FILEMODE = 'w'  # 'a' once this run's log has been truncated; pool workers start with 'a'
 log_file_path = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), 'compressor_log.txt')
 
+def truncate_log_once():
+    """ Clears the previous run's log, once per run. Every handler appends, so the parent calls this before starting
+        pool workers and a later first error of its own cannot wipe the entries they wrote """
+    global _LOG_FILEMODE
+    if _LOG_FILEMODE == 'w':
+        _LOG_FILEMODE = 'a'
+        if os.path.exists(log_file_path): open(log_file_path, 'w').close()
+
 def setup_logging():
     if not logging.getLogger().handlers:
+        truncate_log_once()
         logging.basicConfig(
             level=logging.DEBUG, 
             format='%(asctime)s - %(levelname)s - %(message)s',
             filename=log_file_path,
-            filemode='w'
+            filemode='a'
         )
 
 def log_error(message, exc_info=False):
@@ -30,13 +48,51 @@ def log_error(message, exc_info=False):
     _HAS_ERROR_OCCURRED = True
     logging.error(message, exc_info=exc_info)
 
+tk = ttk = messagebox = filedialog = None  # Bound by _tk() the first time a window or dialog is needed
+
+def _tk():
+    """ Imports tkinter on demand so headless runs and pool workers never load it """
+    global tk, ttk, messagebox, filedialog
+    if tk is None:
+        import tkinter as tk
+        from tkinter import ttk, messagebox, filedialog
+    return tk
+
+if sys.platform == 'win32':
+    # Bound once, with explicit types, instead of walking ctypes.windll.user32 on every call
+    _user32 = ctypes.WinDLL('user32')
+    _GetAsyncKeyState = _user32.GetAsyncKeyState
+    _GetAsyncKeyState.argtypes, _GetAsyncKeyState.restype = [ctypes.c_int], ctypes.c_short
+    _MessageBoxW = _user32.MessageBoxW
+    _MessageBoxW.argtypes, _MessageBoxW.restype = [ctypes.c_void_p, ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_uint], ctypes.c_int
+else:
+    def _GetAsyncKeyState(key): return 0  # No global key state to read: treated as not pressed
+    _MessageBoxW = None
+
+def show_message(title, text, kind='info'):
+    """ Ownerless 'info', 'warning' or 'error' dialog. Uses the native Windows message box, so headless runs and
+        pool workers never load tkinter; other platforms fall back to tkinter's messagebox. """
+    if _MessageBoxW is not None: _MessageBoxW(None, text, title, {'info': 0x40, 'warning': 0x30, 'error': 0x10}[kind]); return
+    _tk(); {'info': messagebox.showinfo, 'warning': messagebox.showwarning, 'error': messagebox.showerror}[kind](title, text)
+
 try:
+    # Pillow-SIMD (x86 CPUs with SSE4/AVX2; built from source on Windows, see build.bat) is API-compatible with much faster resampling;
+    # Pillow only decodes, resizes and hands raw images to the bundled encoders here, so either works unchanged
     from PIL import Image
     from PIL import BmpImagePlugin, IcoImagePlugin
 except ImportError:
     log_error("Pillow library not found.")
-    messagebox.showerror("Dependency Error", "The 'Pillow' library was not found.\nPlease install it by running: pip install Pillow")
+    if sys.platform == 'win32' or os.environ.get('DISPLAY'):
+        show_message("Dependency Error", "The 'Pillow' library was not found.\nPlease install it by running: pip install Pillow")
     sys.exit(1)
+try:
+    import numpy as np  # Optional: vectorizes the PNG alpha scan
+except ImportError:
+    np = None
+try:
+    import imagesize  # Optional: reads image dimensions from the header bytes alone
+except ImportError:
+    imagesize = None
 
 # --- String Constants ---
 STRINGS = {
@@ -56,12 +112,48 @@ STRINGS = {
     "overwrite_label": "Overwrite original file", "keep_original_format": "Keep Original",
     "original_folder": "Original Folder", "compress_button": "Compress Files", "browse_button": "Browse...",
     "files_label": "Files to Process", "no_file_selected": "Please select a file from the list.",
-    "headless_success": "{count} file(s) processed successfully.",
+    "headless_success": "{count} file(s) processed successfully.", "close_button": "Close",
     "max_png_label": "Enable Maximum PNG Compression (Slow)",
-    "auto_convert_png_label": "Auto-convert opaque PNG to JPG for best size"
+    "auto_convert_png_label": "Auto-convert opaque PNG to JPG for best size",
+    "copied_unchanged": "'{name}' copied unchanged: re-encoding it was no smaller.",
+    "left_unchanged": "'{name}' left unchanged: re-encoding it was no smaller."
 }
+# Bound once: compared against the options of every processed file and every estimate
+_KEEP_ORIG, _ORIG_FOLDER = STRINGS["keep_original_format"], STRINGS["original_folder"]
 
 # --- Helper & Core Logic ---
+@dataclass(frozen=True, slots=True)
+class Options:
+    """ One batch's settings: built once, shared by every file and picklable for the pool workers """
+    mode: str = "quality"  # "quality" or "size"
+    quality: int = 75
+    target_size: int = 0  # KB, size mode only
+    resize_enabled: bool = False
+    width: int = 0
+    height: int = 0
+    keep_aspect_ratio: bool = True
+    output_dir: str = _ORIG_FOLDER
+    suffix: str = "-tiny"
+    format: str = _KEEP_ORIG
+    overwrite: bool = False
+    max_png: bool = False
+    auto_convert_png: bool = False
+    @property
+    def needs_resize(self): return self.resize_enabled and self.width > 0 and self.height > 0
+
+# Input file types each target's encoder reads directly (cjpegli or mozjpeg cjpeg, pngquant, cwebp); anything else goes through Pillow first.
+# BMP and Targa stay with Pillow: cjpeg rejects several valid variants (BI_BITFIELDS, RLE, OS/2 v2, 32-bit alpha) and cjpegli reads neither
+NATIVE_INPUTS = {'jpeg': {'jpg', 'jpeg', 'png', 'ppm', 'pgm'}, 'jpg': {'jpg', 'jpeg', 'png', 'ppm', 'pgm'},
+                 'png': {'png'}, 'webp': {'jpg', 'jpeg', 'png', 'tif', 'tiff', 'webp'}}
+_STDIN_FORMATS = {'jpeg': 'PPM', 'jpg': 'PPM', 'webp': 'PNG'}  # Lossless formats cjpeg/cwebp accept on stdin
+# Typical encoded bytes per pixel at a given quality (photographic content); seeds the size-mode search
+_BYTES_PER_PIXEL = ((10, 0.04), (30, 0.08), (50, 0.12), (75, 0.22), (90, 0.38), (95, 0.55), (100, 1.0))
+_MMAP_MIN_BYTES = 1 << 20  # Inputs from this size up are decoded from a memory map rather than buffered reads
+# Downscaled stand-ins hold more detail per pixel, so their pixel-scaled sizes run high. Approximate, hand-tuned factors:
+# picked so the scaled 512px estimate of a few multi-megapixel sample images landed near their real full-size output, not fitted to a corpus
+_THUMB_CALIBRATION = {'jpeg': 0.88, 'jpg': 0.88, 'webp': 0.95}
+
+@lru_cache(maxsize=None)
 def get_resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
     # FIX: Make path resolution robust, independent of working directory
@@ -73,25 +165,82 @@ def get_resource_path(relative_path):
         base_path = os.path.dirname(os.path.abspath(sys.argv[0]))
     return os.path.join(base_path, relative_path)
 
-def get_tool_path(tool_name):
+_WARN_MISSING_TOOLS = True  # Off in pool workers: the parent already resolved the batch's tools and showed any warning
+
+def _warn_missing(tool_name, path):
+    log_error(f"Tool not found at expected path: {path}")
+    if _WARN_MISSING_TOOLS: show_message(STRINGS["error_title"], f"{tool_name} not found. This feature will be disabled.", 'warning')
+
+@lru_cache(maxsize=None)
+def get_tool_path(tool_name, required=True):
+    """ Resolved once per tool; a missing required tool is reported on the first lookup only """
     path = get_resource_path(os.path.join('tools', tool_name))
     if not os.path.exists(path):
-        log_error(f"Tool not found at expected path: {path}")
-        messagebox.showwarning(STRINGS["error_title"], f"{tool_name} not found. This feature will be disabled.")
+        if required: _warn_missing(tool_name, path)
         return None
     return path
 
+@lru_cache(maxsize=None)
+def get_cjpegli_path():
+    """ The bundled tools/cjpegli.exe, or None to leave JPEG encoding to cjpeg. Checked once per process: a tiny
+        stdin-to-file encode and a file-to-stdout re-encode must both yield JPEGs, covering every argument form compress_jpeg uses """
+    path = get_tool_path('cjpegli.exe', required=False)
+    if not path: return None
+    def run(*args, data=None):
+        return subprocess.run([path, *args, "-q", "75"], input=data, capture_output=True, check=True, creationflags=subprocess.CREATE_NO_WINDOW).stdout
+    try:
+        with tempfile.TemporaryDirectory(prefix='ultcomp_') as tmp:
+            probe = os.path.join(tmp, "probe.jpg")
+            run("-", probe, data=b"P6\n1 1\n255\n\x80\x80\x80")
+            with open(probe, 'rb') as f: from_file = f.read()
+            if from_file.startswith(b'\xff\xd8') and run(probe, "-").startswith(b'\xff\xd8'): return path
+        log_error("cjpegli.exe self-check produced no JPEG; falling back to cjpeg.")
+    except (OSError, subprocess.SubprocessError) as e: log_error(f"cjpegli.exe self-check failed, falling back to cjpeg: {e}")
+    return None
+
+def get_image_size(path):
+    """ (width, height) from the file header: imagesize when installed, else Pillow's lazy open (no pixel decode either way) """
+    if imagesize is not None:
+        w, h = imagesize.get(path)
+        if w > 0 and h > 0: return w, h  # (-1, -1) for formats imagesize cannot parse
+    with Image.open(path) as img: return img.size
+
+def quality_for_density(bytes_per_pixel):
+    """ Piecewise-linear inverse of _BYTES_PER_PIXEL, clamped to its ends """
+    if bytes_per_pixel <= _BYTES_PER_PIXEL[0][1]: return _BYTES_PER_PIXEL[0][0]
+    for (q0, b0), (q1, b1) in zip(_BYTES_PER_PIXEL, _BYTES_PER_PIXEL[1:]):
+        if bytes_per_pixel <= b1: return round(q0 + (bytes_per_pixel - b0) * (q1 - q0) / (b1 - b0))
+    return _BYTES_PER_PIXEL[-1][0]
+
+def remove_temp_files(paths):
+    """ One syscall per file: removing and ignoring a missing file is cheaper than checking first """
+    for f in paths:
+        try: os.remove(f)
+        except FileNotFoundError: pass
+
+def may_keep_original(file_path, target_format, resized):
+    """ A same-format JPEG/WEBP re-encode can come out larger than its source at any quality (high settings, or an
+        already optimized file): the original is kept whenever it does """
+    source_format = os.path.splitext(file_path)[1].lower().strip('.').replace('jpg', 'jpeg')
+    return not resized and source_format in ('jpeg', 'webp') and target_format.replace('jpg', 'jpeg') == source_format
+
 class ImageProcessor:
-    def __init__(self, status_callback=None): self.status_callback = status_callback
+    def __init__(self, status_callback=None):
+        self.status_callback = status_callback
+        # One private temp dir per processor; names come from a counter, so no file is created until a tool writes it
+        self._tmpdir, self._ctr = tempfile.mkdtemp(prefix='ultcomp_'), itertools.count()
+        atexit.register(shutil.rmtree, self._tmpdir, ignore_errors=True)
+    def _temp_path(self, suffix): return os.path.join(self._tmpdir, f"{next(self._ctr)}{suffix}")
     def _update_status(self, message):
         if self.status_callback: self.status_callback(message)
-    def _run_tool(self, command):
+    def _run_tool(self, command, return_stdout=False, input_data=None):
+        """ input_data is fed to the tool's stdin. With return_stdout, a successful run yields the tool's stdout bytes instead of a status message """
         tool_name = os.path.basename(command[0])
         try:
-            result = subprocess.run(command, check=False, capture_output=True, creationflags=subprocess.CREATE_NO_WINDOW)
+            result = subprocess.run(command, input=input_data, check=False, capture_output=True, creationflags=subprocess.CREATE_NO_WINDOW)
             if tool_name == 'pngquant.exe' and result.returncode in [98, 99]: return True, "Already Optimized"
             if result.returncode != 0: raise subprocess.CalledProcessError(result.returncode, command, output=result.stdout, stderr=result.stderr)
-            return True, "Success"
+            return True, result.stdout if return_stdout else "Success"
         except subprocess.CalledProcessError as e:
             stderr_msg = e.stderr.decode(encoding='utf-8', errors='replace').strip() if e.stderr else ""
             stdout_msg = e.stdout.decode(encoding='utf-8', errors='replace').strip() if e.stdout else ""
@@ -101,41 +250,88 @@ class ImageProcessor:
         except FileNotFoundError: log_error(f"Tool not found: {tool_name}"); return False, f"Tool not found: {tool_name}"
         except Exception as e: log_error(f"An unexpected error occurred while running tool: {e}", exc_info=True); return False, str(e)
     def is_png_fully_opaque(self, file_path):
+        opaque, img = self._open_checking_opacity(file_path)
+        if img is not None: img.close()
+        return opaque
+    def _open_checking_opacity(self, file_path):
+        """ Returns (opaque, open image or None); callers may keep the image, already decoded when it has an alpha band """
+        img = None
         try:
-            with Image.open(file_path) as img:
-                if img.mode == 'P':
-                    if 'transparency' in img.info: return False
-                if 'A' in img.getbands(): return not any(pixel < 255 for pixel in img.getchannel('A').getdata())
-                return True
-        except Exception as e: log_error(f"Could not check transparency for {os.path.basename(file_path)}: {e}"); return False
-    def compress_jpeg(self, in_path, out_path, quality):
+            img = Image.open(file_path); return self._is_image_opaque(img), img
+        except Exception as e:
+            if img is not None: img.close()
+            log_error(f"Could not check transparency for {os.path.basename(file_path)}: {e}"); return False, None
+    def _is_image_opaque(self, img):
+        if img.mode == 'P':
+            transparency = img.info.get('transparency')
+            if isinstance(transparency, int): return False  # One palette index is fully transparent
+            # Per-entry alpha comes from the tRNS chunk (bytes) or from an RGBA palette
+            if transparency is not None: alphas = transparency
+            elif img.palette and img.palette.mode == 'RGBA': alphas = img.palette.palette[3::4]
+            else: return True
+            return not alphas or bool((np.frombuffer(alphas, dtype=np.uint8).min() if np is not None else min(alphas)) == 255)
+        if 'A' in img.getbands():
+            w, h = img.size
+            for y0 in range(0, h, 256):  # Scan in row bands: stops at the first band with a transparent pixel
+                band = img.crop((0, y0, w, min(y0 + 256, h))).getchannel('A')
+                if np is None:
+                    data = band.tobytes()  # tobytes and count both run in C: no per-pixel Python objects
+                    if data.count(b'\xff') != len(data): return False
+                elif np.asarray(band, dtype=np.uint8).min() < 255: return False
+        return True
+    # compress_jpeg/compress_webp: pass out_path=None to get the encoded bytes back from the tool's stdout,
+    # and input_data (PPM for cjpeg, PNG for cwebp) to feed the image through stdin instead of reading in_path
+    def compress_jpeg(self, in_path, out_path, quality, input_data=None):
+        # jpegli (optional tools/cjpegli.exe) gives smaller files at the same quality and encodes faster than mozjpeg
+        cjpegli_path = get_cjpegli_path()
+        if cjpegli_path and (input_data is not None or os.path.splitext(in_path)[1].lower().strip('.') in NATIVE_INPUTS['jpeg']):
+            return self._run_tool([cjpegli_path, in_path if input_data is None else "-", out_path or "-", "-q", str(quality)],
+                                  return_stdout=not out_path, input_data=input_data)
         cjpeg_path = get_tool_path('cjpeg.exe');
         if not cjpeg_path: return False, "cjpeg.exe not found."
-        return self._run_tool([cjpeg_path, "-quality", str(quality), "-progressive", "-outfile", out_path, in_path])
-    def compress_webp(self, in_path, out_path, quality):
+        out_args = ["-outfile", out_path] if out_path else []
+        in_args = [in_path] if input_data is None else []
+        return self._run_tool([cjpeg_path, "-quality", str(quality), "-progressive"] + out_args + in_args, return_stdout=not out_path, input_data=input_data)
+    def compress_webp(self, in_path, out_path, quality, input_data=None):
         cwebp_path = get_tool_path('cwebp.exe');
         if not cwebp_path: return False, "cwebp.exe not found."
-        return self._run_tool([cwebp_path, "-q", str(quality), in_path, "-o", out_path])
-    def find_best_quality(self, in_path, target_kb, compress_func):
+        in_args = [in_path] if input_data is None else ["--", "-"]  # '--' must come last: cwebp stops parsing options there
+        return self._run_tool([cwebp_path, "-q", str(quality), "-o", out_path or "-"] + in_args, return_stdout=not out_path, input_data=input_data)
+    def _probe(self, in_path, compress_func, quality, input_data=None):
+        is_success, data = compress_func(in_path, None, quality, input_data)  # Streamed to stdout: no temp file per probe
+        return data if is_success and data else None  # An empty stdout is a failed encode, not a 0-byte fit
+    def find_best_quality(self, in_path, target_kb, compress_func, input_data=None, pixels=None):
+        """ Returns (quality, encoded bytes of that probe); the bytes are None when no probe fit and quality fell back to 1.
+            With the output's pixel count the first probe comes from the bytes-per-pixel table instead of q=75. """
         self._update_status(STRINGS["status_finding_quality"].format(size=target_kb)); target_bytes = target_kb * 1024
-        low, high, best_quality = 1, 100, -1
+        low, high, best_quality, best_data = 1, 100, -1, None  # Every probed q below 'low' fits the target, every one above 'high' overshoots
+        # Model-seeded search: probe the predicted q, correct it from the size ratio, then interpolate between the last two probes
+        q, prev = (max(1, min(100, quality_for_density(target_bytes / pixels))) if pixels else 75), None
+        for _ in range(4):
+            data = self._probe(in_path, compress_func, q, input_data); size = None if data is None else len(data)
+            if size is not None and size <= target_bytes:
+                best_quality, best_data, low = q, data, q + 1
+                if size >= target_bytes * 0.95: return q, data
+            else: high = q - 1
+            if size is None or low > high: break
+            if prev is None: q_next = q * (target_bytes / size) ** 0.5
+            elif size != prev[1]: q_next = q + (target_bytes - size) * (q - prev[0]) / (size - prev[1])
+            else: break
+            prev, q = (q, size), max(low, min(high, round(q_next)))
+        if best_quality != -1: return best_quality, best_data
+        # Fallback: the model overshot, bisect what is left of the range
         for _ in range(8):
             if low > high: break
             q = (low + high) // 2
-            with tempfile.NamedTemporaryFile(suffix=".tmp", delete=False) as temp_out: temp_out_name = temp_out.name
-            try:
-                is_success, _ = compress_func(in_path, temp_out_name, q)
-                if is_success and os.path.exists(temp_out_name):
-                    if os.path.getsize(temp_out_name) <= target_bytes: best_quality, low = q, q + 1
-                    else: high = q - 1
-                else: high = q - 1
-            finally:
-                if os.path.exists(temp_out_name): os.remove(temp_out_name)
-        return best_quality if best_quality != -1 else 1
+            data = self._probe(in_path, compress_func, q, input_data)
+            if data is not None and len(data) <= target_bytes: best_quality, best_data, low = q, data, q + 1
+            else: high = q - 1
+        return (best_quality, best_data) if best_quality != -1 else (1, None)
     def compress_png(self, in_path, out_path, quality_range="60-80", use_zopfli=True):
-        pngquant_path, zopflipng_path = get_tool_path('pngquant.exe'), get_tool_path('zopflipng.exe')
-        if not pngquant_path or not zopflipng_path: return False, "PNG tools (pngquant/zopflipng) not found."
-        temp_path = out_path if not use_zopfli else os.path.join(tempfile.gettempdir(), f"quant_{os.path.basename(out_path)}")
+        pngquant_path = get_tool_path('pngquant.exe')
+        zopflipng_path = get_tool_path('zopflipng.exe') if use_zopfli else None  # Only required for maximum compression
+        if not pngquant_path or (use_zopfli and not zopflipng_path): return False, "PNG tools (pngquant/zopflipng) not found."
+        temp_path = out_path if not use_zopfli else self._temp_path(".png")
         try:
             p_command = [pngquant_path, '--force', '--strip', '--quality', quality_range, '--speed=1', '--output', temp_path, in_path]
             quant_success, quant_msg = self._run_tool(p_command)
@@ -143,104 +339,224 @@ class ImageProcessor:
             if quant_msg == "Already Optimized":
                 if not use_zopfli: shutil.copy2(in_path, out_path)
                 else:
-                    zopflipng_path = get_tool_path('zopflipng.exe')
-                    if not zopflipng_path: return False, "zopflipng.exe not found."
                     z_command = [zopflipng_path, '-y', '--iterations=15', in_path, out_path]
                     return self._run_tool(z_command)
                 return True, quant_msg
             if use_zopfli:
-                zopflipng_path = get_tool_path('zopflipng.exe')
-                if not zopflipng_path: return False, "zopflipng.exe not found."
                 z_command = [zopflipng_path, '-y', '--iterations=15', temp_path, out_path]
                 return self._run_tool(z_command)
             else: return True, "Success"
         finally:
-            if use_zopfli and os.path.exists(temp_path): os.remove(temp_path)
+            if use_zopfli: remove_temp_files([temp_path])
     def _safe_copy_for_processing(self, file_path):
         try:
             file_path.encode('ascii'); return file_path, None
         except UnicodeEncodeError:
             _, ext = os.path.splitext(file_path)
-            safe_name = f"temp_{uuid.uuid4().hex}{ext}"; safe_path = os.path.join(tempfile.gettempdir(), safe_name)
-            shutil.copy2(file_path, safe_path)
-            logging.info(f"Copied non-ASCII filename to safe temp path '{safe_path}'")
+            safe_path = self._temp_path(ext)
+            try: os.link(file_path, safe_path); operation = "Linked"  # An ASCII-named hardlink: no data is copied
+            except OSError: shutil.copy2(file_path, safe_path); operation = "Copied"  # e.g. temp dir on another volume
+            logging.info(f"{operation} non-ASCII filename to safe temp path '{safe_path}'")
             return safe_path, safe_path
-    def _convert_image(self, source_path, target_format):
-        temp_converted_path = os.path.join(tempfile.gettempdir(), f"converted_{uuid.uuid4().hex}.{target_format}")
-        with Image.open(source_path) as img:
-            save_options = {}
-            if target_format in ['jpeg', 'jpg']:
-                if img.mode == 'RGBA': img = img.convert('RGB')
-                save_options['quality'] = 98
-            elif target_format == 'png':
-                if img.mode != 'RGBA': img = img.convert('RGBA')
-            img.save(temp_converted_path, **save_options)
-        return temp_converted_path
+    def _to_target_mode(self, img, target_format):
+        """ Returns the image in a mode the target format can store """
+        if target_format in ['jpeg', 'jpg']:
+            if img.mode not in ('RGB', 'L'): img = img.convert('RGB')
+        elif target_format == 'png':
+            if img.mode != 'RGBA': img = img.convert('RGBA')
+        elif target_format == 'webp':
+            if img.mode not in ('RGB', 'RGBA'): img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+        return img
+    def _resize(self, img, size, resample=Image.Resampling.LANCZOS):
+        """ Past a 3x downscale, Pillow first box-reduces by an integer factor and runs the filter only on what is left """
+        reducing_gap = 3.0 if img.width > 3 * size[0] and img.height > 3 * size[1] else None
+        return img.resize(size, resample, reducing_gap=reducing_gap)
+    def _stdin_data(self, img, target_format):
+        """ The lossless in-memory image cjpeg/cwebp read from stdin, or None when the target's encoder needs a file """
+        stream_format = _STDIN_FORMATS.get(target_format)
+        if not stream_format: return None
+        buf = io.BytesIO(); img.save(buf, format=stream_format, **({'compress_level': 1} if stream_format == 'PNG' else {}))
+        return buf.getvalue()
 
-    def process_file(self, file_path, options):
+    def _open_mapped(self, file_path):
+        """ Returns (image, map or None): large files are opened over a read-only memory map, so the decoder
+            reads straight from the page cache instead of issuing a read call per chunk """
+        if os.path.getsize(file_path) < _MMAP_MIN_BYTES: return Image.open(file_path), None
+        with open(file_path, 'rb') as f: mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  # The map outlives the handle
+        try: return Image.open(mapped), mapped
+        except Exception: mapped.close(); raise
+    def _encoder_input(self, file_path, options, target_format, img, temp_files):
+        """ Returns (path, stdin bytes) for the encoder: the original file when the encoder reads it natively, else the
+            decoded, resized and converted image, piped in or saved once to a temp file. img is an image the opacity
+            check already decoded, or None """
+        needs_resize = options.needs_resize
+        needs_convert = os.path.splitext(file_path)[1].lower().strip('.') not in NATIVE_INPUTS.get(target_format, {target_format})
+        # The alpha scan of an opaque RGBA PNG decoded every pixel: piping that image on beats the encoder inflating the PNG again
+        reuse_decoded = img is not None and 'A' in img.getbands() and target_format in _STDIN_FORMATS
+        if not needs_resize and not needs_convert and not reuse_decoded:
+            # The encoder reads the original file, so it needs an ASCII-safe path; Pillow handles any path itself
+            current_path, safe_copy = self._safe_copy_for_processing(file_path)
+            if safe_copy: temp_files.append(safe_copy)
+            return current_path, None
+        mapped = None
+        if img is None: img, mapped = self._open_mapped(file_path)
+        with img:
+            try:
+                # JPEG sources decode straight to a 1/2, 1/4 or 1/8 DCT scale that still leaves LANCZOS 2x the target to work from
+                if needs_resize: img.draft(None, (options.width * 2, options.height * 2))  # Must come before load()
+                img.load()  # Single-frame formats close the file once loaded; a no-op for an image the opacity check decoded
+            finally:
+                if mapped is not None: mapped.close()  # Unmapped right away: overwrite mode replaces this very file later
+            if needs_resize: img = self._resize(img, (options.width, options.height))
+            img = self._to_target_mode(img, target_format)
+            input_data = self._stdin_data(img, target_format)
+            if input_data is None:
+                current_path = self._temp_path(f".{target_format}"); temp_files.append(current_path)
+                img.save(current_path)
+            else: current_path = None  # cjpeg/cwebp read the lossless in-memory image from stdin: no temp file written, read back and deleted
+        if needs_resize: self._update_status(STRINGS["status_resized"].format(w=options.width, h=options.height))
+        return current_path, input_data
+    def _encode_lossy(self, compress_func, current_path, temp_output_path, options, input_data, source_path):
+        """ Size mode writes out the winning probe's bytes rather than encoding that quality a second time """
+        quality, data = options.quality, None
+        if options.mode == "size":
+            w, h = (options.width, options.height) if options.needs_resize else get_image_size(source_path)
+            quality, data = self.find_best_quality(current_path, options.target_size, compress_func, input_data, pixels=w * h)
+        if data is None: return (quality,) + compress_func(current_path, temp_output_path, quality, input_data)
+        with open(temp_output_path, 'wb') as f: f.write(data)
+        return quality, True, ""
+
+    def process_file(self, file_path, options, png_opaque=None):
+        """ png_opaque is this file's opacity when the caller already checked it (the GUI does for its estimate), else None """
         original_basename = os.path.basename(file_path); file_name, file_ext_orig = os.path.splitext(original_basename)
-        should_overwrite = options.get('overwrite', False)
-        target_format_str = options.get("format", STRINGS["keep_original_format"])
-        is_converting_format = target_format_str != STRINGS["keep_original_format"]
+        should_overwrite = options.overwrite
+        target_format_str = options.format
+        is_converting_format = target_format_str != _KEEP_ORIG
         target_format = target_format_str.lower() if is_converting_format else file_ext_orig.lower().replace('.', '')
-        if options.get("auto_convert_png") and file_ext_orig.lower() == '.png' and not is_converting_format:
-            if self.is_png_fully_opaque(file_path): target_format, is_converting_format = "jpeg", True
-        if should_overwrite and is_converting_format:
-            msg = STRINGS["overwrite_format_error"]; log_error(msg); return False, msg
-        final_output_path = file_path if should_overwrite else os.path.join(
-            options.get('output_dir', os.path.dirname(file_path)) if options.get('output_dir') != STRINGS["original_folder"] else os.path.dirname(file_path),
-            f"{file_name}{options.get('suffix', '-tiny')}.{target_format}")
-        with tempfile.NamedTemporaryFile(suffix=f".{target_format}", delete=False) as temp_out: temp_output_path = temp_out.name
-        current_path, temp_files = file_path, [temp_output_path]
+        img, temp_files = None, []
         try:
-            current_path, safe_copy = self._safe_copy_for_processing(current_path)
-            if safe_copy: temp_files.append(safe_copy)
-            if options.get("resize_enabled") and options.get("width", 0) > 0 and options.get("height", 0) > 0:
-                _, file_ext = os.path.splitext(current_path)
-                temp_resized = os.path.join(tempfile.gettempdir(), f"resized_{uuid.uuid4().hex}{file_ext}")
-                with Image.open(current_path) as img: img.resize((options["width"], options["height"]), Image.Resampling.LANCZOS).save(temp_resized)
-                current_path, temp_files = temp_resized, temp_files + [temp_resized]
-                self._update_status(STRINGS["status_resized"].format(w=options["width"], h=options["height"]))
-            
-            current_ext_no_dot = os.path.splitext(current_path)[1].lower().strip('.')
-            if current_ext_no_dot != target_format:
-                temp_converted = self._convert_image(current_path, target_format)
-                current_path, temp_files = temp_converted, temp_files + [temp_converted]
-                
-            quality, is_success, message = options.get("quality", 75), False, "An unknown compression error occurred."
+            if options.auto_convert_png and file_ext_orig.lower() == '.png' and not is_converting_format:
+                opaque = png_opaque
+                # The alpha scan decodes the PNG; _encoder_input reuses that image instead of decoding it a second time
+                if opaque is None: opaque, img = self._open_checking_opacity(file_path)
+                if opaque: target_format, is_converting_format = "jpeg", True
+            if should_overwrite and is_converting_format:
+                msg = STRINGS["overwrite_format_error"]; log_error(msg); return False, msg
+            final_output_path = file_path if should_overwrite else os.path.join(
+                options.output_dir if options.output_dir != _ORIG_FOLDER else os.path.dirname(file_path),
+                f"{file_name}{options.suffix}.{target_format}")
+            temp_output_path = self._temp_path(f".{target_format}"); temp_files.append(temp_output_path)
+            current_path, input_data = self._encoder_input(file_path, options, target_format, img, temp_files)
+
+            quality, is_success, message = options.quality, False, "An unknown compression error occurred."
             if target_format in ['jpeg', 'jpg']:
-                if options.get("mode") == "size": quality = self.find_best_quality(current_path, options["target_size"], self.compress_jpeg)
-                is_success, message = self.compress_jpeg(current_path, temp_output_path, quality)
+                quality, is_success, message = self._encode_lossy(self.compress_jpeg, current_path, temp_output_path, options, input_data, file_path)
                 if is_success: message = f"'{original_basename}' -> JPEG, quality {quality}."
             elif target_format == 'png':
-                quality_range = f"{quality-10}-{quality}" if quality > 10 else f"0-{quality}"; use_zopfli = options.get("max_png", False)
+                quality_range = f"{quality-10}-{quality}" if quality > 10 else f"0-{quality}"; use_zopfli = options.max_png
                 is_success, message = self.compress_png(current_path, temp_output_path, quality_range, use_zopfli=use_zopfli)
                 if is_success and message == "Already Optimized": message = f"'{original_basename}' is already optimized."
                 elif is_success: message = f"'{original_basename}' compressed to PNG."
             elif target_format == 'webp':
-                if options.get("mode") == "size": quality = self.find_best_quality(current_path, options["target_size"], self.compress_webp)
-                is_success, message = self.compress_webp(current_path, temp_output_path, quality)
+                quality, is_success, message = self._encode_lossy(self.compress_webp, current_path, temp_output_path, options, input_data, file_path)
                 if is_success: message = f"'{original_basename}' -> WEBP, quality {quality}."
             elif target_format == 'ico':
-                with Image.open(current_path) as img: img.save(temp_output_path, format='ICO', sizes=[(32,32), (48,48), (64,64)])
+                with Image.open(current_path) as ico_src: ico_src.save(temp_output_path, format='ICO', sizes=[(32,32), (48,48), (64,64)])
                 is_success, message = True, f"'{original_basename}' -> ICO."
             else: return False, STRINGS["unsupported_type"]
-            if is_success:
-                if message != f"'{original_basename}' is already optimized.": shutil.move(temp_output_path, final_output_path)
-                temp_files.remove(temp_output_path); return True, message
-            else: return False, message
+            if not is_success: return False, message
+            if (may_keep_original(file_path, target_format, options.needs_resize)
+                    and os.path.getsize(temp_output_path) >= os.path.getsize(file_path)):
+                if final_output_path == file_path: return True, STRINGS["left_unchanged"].format(name=original_basename)  # Overwrite mode
+                shutil.copyfile(file_path, final_output_path)  # copyfile takes the OS fast path (sendfile on Linux)
+                return True, STRINGS["copied_unchanged"].format(name=original_basename)
+            if message != f"'{original_basename}' is already optimized.": shutil.move(temp_output_path, final_output_path)
+            temp_files.remove(temp_output_path); return True, message
         except Exception as e: log_error(f"A fatal error occurred during processing: {e}", exc_info=True); return False, f"An unexpected error occurred: {e}"
         finally:
-            for f in temp_files:
-                if os.path.exists(f): os.remove(f)
+            if img is not None: img.close()  # The opacity check's image; a no-op if _encoder_input already decoded and closed it
+            remove_temp_files(temp_files)
+
+# --- Batch Workers (run inside ProcessPoolExecutor processes) ---
+_worker_processor = None
+
+def _init_worker(status_queue=None):
+    """ Gives every pool process one ImageProcessor (with its own temp dir) that reports status through the queue, if any """
+    global _worker_processor, _LOG_FILEMODE, _WARN_MISSING_TOOLS
+    _LOG_FILEMODE, _WARN_MISSING_TOOLS = 'a', False  # The parent truncated the log and warned about missing tools
+    _worker_processor = ImageProcessor(status_queue.put if status_queue is not None else None)
+
+def process_file_worker(file_path, options, png_opaque=None):
+    return _worker_processor.process_file(file_path, options, png_opaque)
+
+_MAX_WINDOWS_WORKERS = 61  # ProcessPoolExecutor's limit on win32 (WaitForMultipleObjects handles), whatever the core count
+
+def pool_workers(file_count):
+    """ One pool process per core, never more than there are files nor than the platform allows """
+    return min(os.cpu_count() or 1, file_count, *((_MAX_WINDOWS_WORKERS,) if sys.platform == 'win32' else ()))
+
+_FORMAT_TOOLS = {'jpg': 'cjpeg.exe', 'jpeg': 'cjpeg.exe', 'webp': 'cwebp.exe', 'png': 'pngquant.exe'}
+
+def resolve_tools(file_paths, options):
+    """ Looks up every encoder the batch needs in the calling thread, before any worker starts: a missing tool is warned
+        about once, here, and the cjpegli self-check runs once instead of racing in every thread """
+    formats = ({options.format.lower()} if options.format != _KEEP_ORIG
+               else {os.path.splitext(file_path)[1].lower().strip('.') for file_path in file_paths})
+    if options.auto_convert_png and 'png' in formats: formats.add('jpeg')
+    tools = {_FORMAT_TOOLS[f] for f in formats if f in _FORMAT_TOOLS}
+    if options.max_png and 'png' in formats: tools.add('zopflipng.exe')
+    for tool in sorted(tools): get_tool_path(tool)
+    if 'cjpeg.exe' in tools: get_cjpegli_path()
+
+def prepare_pool(file_paths, options):
+    """ Parent-side setup before any pool worker starts: truncates the log and resolves the batch's tools """
+    truncate_log_once(); resolve_tools(file_paths, options)
+
+def _is_encoder_only(file_path, options):
+    """ True when the job never opens the image in Python: the encoder (cjpegli/cjpeg, cwebp) reads the source file
+        itself and writes the result, so its subprocess does all the work """
+    return (os.path.splitext(file_path)[1].lower() in ('.jpg', '.jpeg', '.webp') and options.format == _KEEP_ORIG
+            and not options.needs_resize and options.mode == "quality")
+
+def _results_in_order(submitted):
+    """ Yields (file_path, result) for each (file_path, future) pair in order. A future that raised, such as every one still
+        pending when a crashed worker breaks the pool, becomes an error result instead of ending the batch """
+    for file_path, future in submitted:
+        try: result = future.result()
+        except Exception as e: log_error(f"Worker process failed: {e}", exc_info=True); result = (False, f"An unexpected error occurred: {e}")
+        yield file_path, result
+
+def process_files(file_paths, options):
+    """ Yields (file_path, (is_success, message)) in input order: one pool process per core for several files, in-process otherwise """
+    workers = pool_workers(len(file_paths))
+    if workers < 2:
+        processor = ImageProcessor()
+        for file_path in file_paths: yield file_path, processor.process_file(file_path, options)
+        return
+    if all(_is_encoder_only(file_path, options) for file_path in file_paths):
+        # Nothing CPU-bound runs in Python: threads waiting on encoder subprocesses keep every core busy, with no Python workers to spawn
+        processor = ImageProcessor(); resolve_tools(file_paths, options)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            yield from _results_in_order([(file_path, executor.submit(processor.process_file, file_path, options)) for file_path in file_paths])
+        return
+    prepare_pool(file_paths, options)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        yield from _results_in_order([(file_path, executor.submit(process_file_worker, file_path, options)) for file_path in file_paths])
 
 # --- The GUI ---
-class UltimateCompressorGUI(tk.Tk):
+class UltimateCompressorGUI:
+    """ Main window behaviour; create_gui() combines it with tk.Tk once tkinter has been imported """
     def __init__(self, files):
-        super().__init__(); self.files, self.processor, self.after_id = list(files), ImageProcessor(self.update_status), None
-        self.original_dims, self.is_updating_dims = {}, False
+        super().__init__(); self.files, self.processor, self.after_id = [], ImageProcessor(self.update_status), None
+        self.original_dims, self.is_updating_dims = {}, False  # path -> {'size', 'opaque'}; 'opaque' is None until first needed
+        self._est_generation, self._est_running_params = 0, None
+        self._est_cache = {}  # (mtime, *estimation params) -> estimated KB
+        self._last_redraw = 0.0  # monotonic time of the last forced status redraw
         self.title(STRINGS["app_title"]); self.geometry("450x780"); self.minsize(420, 750)
-        self.create_widgets(); self.toggle_comp_widgets()
+        self.create_widgets(); self.toggle_comp_widgets(); self.set_files(files)
+    def set_files(self, files):
+        self.files = list(files); self.file_listbox.delete(0, tk.END)
+        for f in self.files: self.file_listbox.insert(tk.END, os.path.basename(f))
         if self.files: self.file_listbox.select_set(0); self.on_file_select(None)
     def create_widgets(self):
         main_frame = ttk.Frame(self, padding="10"); main_frame.pack(fill=tk.BOTH, expand=True)
@@ -251,7 +567,6 @@ class UltimateCompressorGUI(tk.Tk):
     def _create_file_list(self, parent):
         frame = ttk.LabelFrame(parent, text=STRINGS["files_label"], padding="10"); frame.pack(fill=tk.X, pady=5)
         self.file_listbox = tk.Listbox(frame, height=5, exportselection=False); self.file_listbox.pack(fill=tk.X, expand=True, side=tk.LEFT, pady=5, padx=5)
-        for f in self.files: self.file_listbox.insert(tk.END, os.path.basename(f))
         self.file_listbox.bind('<<ListboxSelect>>', self.on_file_select)
     def _create_resize_frame(self, parent):
         frame = ttk.LabelFrame(parent, text=STRINGS["resize_label"], padding="10"); frame.pack(fill=tk.X, pady=5)
@@ -302,7 +617,7 @@ class UltimateCompressorGUI(tk.Tk):
         self.is_updating_dims = True
         try:
             widget, sel_idx = self.focus_get(), self.file_listbox.curselection()[0]; f_path = self.files[sel_idx]
-            orig_w, orig_h = self.original_dims[f_path]
+            orig_w, orig_h = self.original_dims[f_path]['size']
             if widget == self.width_entry: new_w = self.width_var.get();
             if new_w > 0: self.height_var.set(int(new_w * orig_h / orig_w))
             elif widget == self.height_entry: new_h = self.height_var.get();
@@ -321,7 +636,7 @@ class UltimateCompressorGUI(tk.Tk):
         is_quality_mode = self.comp_mode.get() == "quality"
         try:
             sel_idx = self.file_listbox.curselection()[0]; f_path = self.files[sel_idx]
-            target_format_str = self.format_var.get(); target_format = target_format_str.lower() if target_format_str != STRINGS["keep_original_format"] else os.path.splitext(f_path)[1].lower().replace('.', '')
+            target_format_str = self.format_var.get(); target_format = target_format_str.lower() if target_format_str != _KEEP_ORIG else os.path.splitext(f_path)[1].lower().replace('.', '')
             is_png_output = (target_format == 'png')
             self.max_png_check.config(state='normal' if is_png_output and is_quality_mode else 'disabled')
             is_png_input = os.path.splitext(f_path)[1].lower() == '.png'
@@ -346,129 +661,214 @@ class UltimateCompressorGUI(tk.Tk):
     def on_file_select(self, event):
         try:
             sel_idx = self.file_listbox.curselection()[0]; f_path = self.files[sel_idx]
-            with Image.open(f_path) as img:
-                w, h = img.size; self.original_dims[f_path] = (w, h)
-                self.original_dims_var.set(f"{w} x {h} px")
-                if not self.resize_enabled.get(): self.width_var.set(w); self.height_var.set(h)
+            if f_path not in self.original_dims:
+                self.original_dims[f_path] = {'size': get_image_size(f_path), 'opaque': None}
+            w, h = self.original_dims[f_path]['size']
+            self.original_dims_var.set(f"{w} x {h} px")
+            if not self.resize_enabled.get(): self.width_var.set(w); self.height_var.set(h)
         except (IndexError, FileNotFoundError): self.original_dims_var.set("N/A")
         self._update_options_state()
         if self.comp_mode.get() == 'quality': self.on_quality_change()
+    def _estimation_params(self):
+        f_path = self.files[self.file_listbox.curselection()[0]]
+        return (f_path, self.quality_var.get(), self.format_var.get(), self.resize_enabled.get(), self.width_var.get(), self.height_var.get(),
+                self.max_png_var.get(), self.auto_convert_png_var.get())
     def start_estimation_thread(self):
         if not self.file_listbox.curselection(): return
+        try: params = self._estimation_params()
+        except (IndexError, tk.TclError): self.update_estimated_size_label(-1); return
+        if params == self._est_running_params: return  # An estimate for exactly these settings is already running
+        try: cache_key = (os.path.getmtime(params[0]),) + params
+        except OSError: cache_key = None
+        self._est_generation += 1
+        if cache_key in self._est_cache: self._est_running_params = None; self.update_estimated_size_label(self._est_cache[cache_key]); return
+        self._est_running_params = params
         self.update_status(STRINGS["status_estimating"]); self.estimated_size_var.set("...")
-        threading.Thread(target=self._run_estimation_in_thread, daemon=True).start()
-    def _run_estimation_in_thread(self):
+        threading.Thread(target=self._run_estimation_in_thread, args=(self._est_generation, params, cache_key), daemon=True).start()
+    def _run_estimation_in_thread(self, gen, params, cache_key=None):
+        # 'gen' is this run's token: once a newer estimate starts, the run stops at its next check and never touches the UI
+        temp_files = []
         try:
-            sel_idx = self.file_listbox.curselection()[0]; f_path = self.files[sel_idx]; quality = self.quality_var.get()
+            f_path, quality, target_format_str, resize_enabled, width, height, use_zopfli, auto_convert_png = params
             if not 1 <= quality <= 100: raise ValueError("Quality out of range")
-            options = {"resize_enabled": self.resize_enabled.get(), "width": self.width_var.get(), "height": self.height_var.get()}
-            target_format_str = self.format_var.get(); target_format = target_format_str.lower() if target_format_str != STRINGS["keep_original_format"] else os.path.splitext(f_path)[1].lower().replace('.', '')
-            original_ext = os.path.splitext(f_path)[1].lower()
-            if self.auto_convert_png_var.get() and original_ext == '.png':
-                if self.processor.is_png_fully_opaque(f_path): target_format = "jpeg"
-            current_path, temp_files = f_path, []
-            safe_path, safe_copy = self.processor._safe_copy_for_processing(current_path)
-            if safe_copy: current_path, temp_files = safe_path, temp_files + [safe_copy]
-            if options["resize_enabled"] and options["width"] > 0 and options["height"] > 0:
-                temp_resized = os.path.join(tempfile.gettempdir(), f"temp_estimate_{uuid.uuid4().hex}{original_ext}")
-                with Image.open(current_path) as img: img.resize((options["width"], options["height"]), Image.Resampling.LANCZOS).save(temp_resized)
-                current_path, temp_files = temp_resized, temp_files + [temp_resized]
-            
-            current_ext_no_dot = os.path.splitext(current_path)[1].lower().strip('.')
-            if current_ext_no_dot != target_format:
-                temp_converted = self.processor._convert_image(current_path, target_format)
-                current_path = temp_converted; temp_files.append(temp_converted)
+            target_format = target_format_str.lower() if target_format_str != _KEEP_ORIG else os.path.splitext(f_path)[1].lower().replace('.', '')
+            original_ext, info = os.path.splitext(f_path)[1].lower(), self.original_dims.get(f_path, {})
+            if auto_convert_png and original_ext == '.png':
+                if info.get('opaque') is None: info['opaque'] = self.processor.is_png_fully_opaque(f_path)  # Scanned once per file, off the UI thread
+                if info['opaque']: target_format = "jpeg"
+            if gen != self._est_generation: return
+            # Large JPEG/WEBP outputs are estimated from a <=512px stand-in: at fixed quality their size scales with pixel count
+            needs_resize = resize_enabled and width > 0 and height > 0
+            if needs_resize: out_w, out_h = width, height
+            elif 'size' in info: out_w, out_h = info['size']
+            else: out_w, out_h = get_image_size(f_path)
+            est_dims, scale, resample = None, 1.0, Image.Resampling.LANCZOS
+            if out_w * out_h > 1_000_000 and target_format in _THUMB_CALIBRATION:
+                ratio = min(512 / out_w, 512 / out_h); est_dims = (max(1, round(out_w * ratio)), max(1, round(out_h * ratio)))
+                scale = out_w * out_h / (est_dims[0] * est_dims[1]) * _THUMB_CALIBRATION[target_format]
+                resample = Image.Resampling.BILINEAR  # Plenty for a size estimate, and several times faster than LANCZOS
+            elif needs_resize: est_dims = (width, height)
+            # Mirrors _encoder_input: JPEG/WEBP encoders get a lossless stdin image, never a Pillow-encoded lossy intermediate
+            input_data = None
+            if est_dims or original_ext.strip('.') not in NATIVE_INPUTS.get(target_format, {target_format}):
+                current_path = None
+                with Image.open(f_path) as img:
+                    if est_dims:
+                        img.draft(None, est_dims)  # JPEG sources decode at a reduced DCT scale
+                        img = self.processor._resize(img, est_dims, resample)
+                    img = self.processor._to_target_mode(img, target_format)
+                    input_data = self.processor._stdin_data(img, target_format)
+                    if input_data is None:
+                        current_path = self.processor._temp_path(f".{target_format}"); temp_files.append(current_path)
+                        img.save(current_path)
+            else:
+                current_path, safe_copy = self.processor._safe_copy_for_processing(f_path)
+                if safe_copy: temp_files.append(safe_copy)
+            if gen != self._est_generation: return
 
-            with tempfile.NamedTemporaryFile(suffix=".tmp", delete=False) as temp_out: temp_out_name = temp_out.name
+            temp_out_name = self.processor._temp_path(".tmp")
             temp_files.append(temp_out_name)
             is_success, msg = False, ""
-            if target_format in ['jpg', 'jpeg']: is_success, msg = self.processor.compress_jpeg(current_path, temp_out_name, quality)
+            if target_format in ['jpg', 'jpeg']: is_success, msg = self.processor.compress_jpeg(current_path, temp_out_name, quality, input_data)
             elif target_format == 'png':
-                q_range = f"{quality-10}-{quality}" if quality > 10 else f"0-{quality}"; use_zopfli = self.max_png_var.get(); is_success, msg = self.processor.compress_png(current_path, temp_out_name, q_range, use_zopfli)
-            elif target_format == 'webp': is_success, msg = self.processor.compress_webp(current_path, temp_out_name, quality)
+                q_range = f"{quality-10}-{quality}" if quality > 10 else f"0-{quality}"; is_success, msg = self.processor.compress_png(current_path, temp_out_name, q_range, use_zopfli)
+            elif target_format == 'webp': is_success, msg = self.processor.compress_webp(current_path, temp_out_name, quality, input_data)
             elif target_format == 'ico':
                 with Image.open(current_path) as img: img.save(temp_out_name, format='ICO', sizes=[(32,32), (48,48), (64,64)]); is_success = True
             
             if is_success:
-                if msg == "Already Optimized": self.after(0, self.update_estimated_size_label, os.path.getsize(current_path) / 1024)
-                else: self.after(0, self.update_estimated_size_label, os.path.getsize(temp_out_name) / 1024)
-            else: self.after(0, self.update_estimated_size_label, -1)
-        except (IndexError, ValueError): self.after(0, self.update_estimated_size_label, -1)
-        except Exception as e: log_error(f"Estimation Thread Error: {e}", exc_info=True); self.after(0, self.update_estimated_size_label, -1)
-        finally:
-            for f in temp_files:
-                if os.path.exists(f): os.remove(f)
+                size_bytes = os.path.getsize(current_path if msg == "Already Optimized" else temp_out_name) * scale
+                if may_keep_original(f_path, target_format, needs_resize): size_bytes = min(size_bytes, os.path.getsize(f_path))  # As process_file
+                self.after(0, self._finish_estimation, gen, size_bytes / 1024, cache_key)
+            else: self.after(0, self._finish_estimation, gen, -1)
+        except (IndexError, ValueError): self.after(0, self._finish_estimation, gen, -1)
+        except Exception as e: log_error(f"Estimation Thread Error: {e}", exc_info=True); self.after(0, self._finish_estimation, gen, -1)
+        finally: remove_temp_files(temp_files)
+    def _finish_estimation(self, gen, size_kb, cache_key=None):
+        if cache_key is not None and size_kb >= 0:
+            self._est_cache[cache_key] = size_kb
+            if len(self._est_cache) > 128: del self._est_cache[next(iter(self._est_cache))]  # FIFO eviction
+        if gen != self._est_generation: return  # Superseded by a newer estimate
+        self._est_running_params = None; self.update_estimated_size_label(size_kb)
     def update_estimated_size_label(self, size_kb):
         if size_kb >= 0: self.estimated_size_var.set(f"~{size_kb:.1f} KB")
         else: self.estimated_size_var.set("Error")
         self.update_status(STRINGS["status_ready"])
     def start_compression(self):
         if not self.files: messagebox.showwarning("No Files", "Please add files to process."); return
-        options = {"resize_enabled": self.resize_enabled.get(), "width": self.width_var.get(), "height": self.height_var.get(),
-                   "keep_aspect_ratio": self.keep_aspect_ratio.get(), "mode": self.comp_mode.get(), "quality": self.quality_var.get(),
-                   "target_size": self.size_var.get(), "output_dir": self.output_dir_var.get(), "suffix": self.suffix_var.get(),
-                   "format": self.format_var.get(), "overwrite": self.overwrite_var.get(), "max_png": self.max_png_var.get(),
-                   "auto_convert_png": self.auto_convert_png_var.get()}
-        self.compress_button.config(state='disabled'); success_msgs, error_msgs = [], []
-        for i, file_path in enumerate(self.files):
-            self.update_status(STRINGS["status_processing"].format(current=i+1, total=len(self.files), filename=os.path.basename(file_path)))
-            is_success, msg = self.processor.process_file(file_path, options); (success_msgs if is_success else error_msgs).append(msg)
-        self.update_status(STRINGS["status_done"]); self.compress_button.config(state='normal')
-        report = ""
-        if success_msgs: report += f"Successfully processed {len(success_msgs)} file(s):\n" + "\n".join(success_msgs)
-        if error_msgs:
-            report += f"\n\nEncountered {len(error_msgs)} error(s):\n" + "\n".join(error_msgs); messagebox.showerror(STRINGS["report_title"], report)
-        elif success_msgs: messagebox.showinfo(STRINGS["report_title"], report)
-        self.destroy()
-    def update_status(self, message): self.status_var.set(message); self.update_idletasks()
+        options = Options(resize_enabled=self.resize_enabled.get(), width=self.width_var.get(), height=self.height_var.get(),
+                          keep_aspect_ratio=self.keep_aspect_ratio.get(), mode=self.comp_mode.get(), quality=self.quality_var.get(),
+                          target_size=self.size_var.get(), output_dir=self.output_dir_var.get(), suffix=self.suffix_var.get(),
+                          format=self.format_var.get(), overwrite=self.overwrite_var.get(), max_png=self.max_png_var.get(),
+                          auto_convert_png=self.auto_convert_png_var.get())
+        self._status_queue = multiprocessing.Queue(); prepare_pool(self.files, options)
+        self._executor = ProcessPoolExecutor(max_workers=pool_workers(len(self.files)), initializer=_init_worker, initargs=(self._status_queue,))
+        # Only once the pool exists: a failure above must leave the window usable
+        self.compress_button.config(state='disabled')
+        self.protocol("WM_DELETE_WINDOW", lambda: None)  # Closing the main window mid-batch would abandon the pool
+        self._futures = {self._executor.submit(process_file_worker, file_path, options, self.original_dims.get(file_path, {}).get('opaque')): file_path
+                         for file_path in self.files}
+        self._pending, self._completed, self._success_count = set(self._futures), 0, 0
+        self._open_report(); self.after(50, self._poll_compression)
+    def _open_report(self):
+        """ Non-modal report window the results stream into as files finish; closing it once done ends the app """
+        self.report_window = win = tk.Toplevel(self); win.title(STRINGS["report_title"]); win.geometry("520x320"); win.transient(self)
+        win.protocol("WM_DELETE_WINDOW", lambda: None)  # Not closable while the batch is still running
+        frame = ttk.Frame(win, padding="10"); frame.pack(fill=tk.BOTH, expand=True)
+        self.report_close_btn = ttk.Button(frame, text=STRINGS["close_button"], command=self.destroy, state='disabled'); self.report_close_btn.pack(side=tk.BOTTOM, pady=(10, 0))
+        scrollbar = ttk.Scrollbar(frame); scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.report_text = tk.Text(frame, wrap='word', height=12, yscrollcommand=scrollbar.set, state='disabled'); self.report_text.pack(fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.report_text.yview)
+    def _append_report(self, text, index='end'):
+        self.report_text.config(state='normal'); self.report_text.insert(index, text); self.report_text.config(state='disabled'); self.report_text.see(tk.END)
+    def _poll_compression(self):
+        try:
+            while True: self.update_status(self._status_queue.get_nowait())
+        except queue.Empty: pass
+        done, self._pending = wait(self._pending, timeout=0, return_when=FIRST_COMPLETED)
+        lines, fmt_processing, total = [], STRINGS["status_processing"].format, len(self.files)
+        for future in done:
+            self._completed += 1; file_path = self._futures[future]
+            self.update_status(fmt_processing(current=self._completed, total=total, filename=os.path.basename(file_path)))
+            try: is_success, msg = future.result()
+            except Exception as e: log_error(f"Worker process failed: {e}", exc_info=True); is_success, msg = False, f"An unexpected error occurred: {e}"
+            self._success_count += is_success
+            lines.append(msg if is_success else f"Error - {os.path.basename(file_path)}: {msg}")
+        if lines: self._append_report("\n".join(lines) + "\n")
+        if self._pending: self.after(50, self._poll_compression); return
+        self._executor.shutdown(); self._finish_compression()
+    def _finish_compression(self):
+        # Compress stays disabled: this run ends with its report window, whose Close button ends the app
+        self.update_status(STRINGS["status_done"]); self.protocol("WM_DELETE_WINDOW", self.destroy)
+        error_count = len(self.files) - self._success_count
+        summary = f"Successfully processed {self._success_count} file(s)." + (f" Encountered {error_count} error(s)." if error_count else "")
+        self._append_report(summary + "\n\n", "1.0")
+        self.report_close_btn.config(state='normal'); self.report_window.protocol("WM_DELETE_WINDOW", self.destroy)
+    def update_status(self, message):
+        # The label text always changes; forced redraws are capped at 10 per second. Anything skipped
+        # is drawn by the event loop's own idle pass, so the last message always shows.
+        self.status_var.set(message); now = time.monotonic()
+        if now - self._last_redraw >= 0.1: self._last_redraw = now; self.update_idletasks()
+
+def create_gui(files):
+    window_class = type("UltimateCompressorWindow", (UltimateCompressorGUI, _tk().Tk), {})
+    return window_class(files)
 
 # --- Main Dispatcher ---
+# Switches the installer's shell verbs pass; '--shift' opens the settings window, as if SHIFT were held
+_CLI_FLAGS = frozenset({'--shift'})
+_SWITCH_PREFIXES = ('-', '/') if sys.platform == 'win32' else ('-',)  # Explorer only ever passes absolute paths like C:\...
+_VK_SHIFT = 0x10
+
+def parse_args(args):
+    """ Splits argv into (flags, files): switches are screened by string checks alone, every other argument costs
+        one stat and must be a regular file """
+    flags, files = set(), []
+    for arg in args:
+        if arg in _CLI_FLAGS: flags.add(arg); continue
+        if arg.startswith(_SWITCH_PREFIXES): continue  # Unknown switch: ignored without a syscall
+        try:
+            if stat.S_ISREG(os.stat(arg).st_mode): files.append(arg)
+        except (OSError, ValueError): pass  # Missing paths and folders are ignored
+    return flags, files
+
 def main():
-    is_shift_pressed = ctypes.windll.user32.GetAsyncKeyState(0x10) & 0x8000 != 0
-    
-    # FIX: Filter command-line arguments to only include actual files
-    potential_files = sys.argv[1:]
-    files_to_process = []
-    for f in potential_files:
-        # This filters out arguments like "--shift" and ensures the path is a file
-        if os.path.isfile(f):
-            files_to_process.append(f)
+    flags, files_to_process = parse_args(sys.argv[1:])
+    is_shift_pressed = '--shift' in flags or _GetAsyncKeyState(_VK_SHIFT) & 0x8000 != 0
 
     if is_shift_pressed or not files_to_process:
+        app = create_gui(files_to_process)
         if not files_to_process:
-            temp_root = tk.Tk()
-            temp_root.withdraw()
+            # The hidden main window parents the file dialog: one Tk root per process instead of a throwaway one
+            app.withdraw()
             files_to_process = filedialog.askopenfilenames(
-                parent=temp_root,
+                parent=app,
                 title="Select Images to Compress",
                 filetypes=[("Image Files", "*.jpg *.jpeg *.png *.webp")]
             )
-            temp_root.destroy()
             if not files_to_process:
+                app.destroy()
                 return
-
-        app = UltimateCompressorGUI(files_to_process)
+            app.set_files(files_to_process); app.deiconify()
         app.mainloop()
     else:
-        processor = ImageProcessor()
-        options = {"mode": "quality", "quality": 75, "resize_enabled": False, "output_dir": STRINGS["original_folder"], 
-                   "suffix": "-tiny", "format": STRINGS["keep_original_format"], "overwrite": False, "max_png": False, "auto_convert_png": True} 
+        options = Options(auto_convert_png=True)  # Headless defaults: quality 75, "-tiny" copies next to the originals
         success_count, error_msgs = 0, []
-        for file_path in files_to_process:
-            is_success, msg = processor.process_file(file_path, options)
+        for file_path, (is_success, msg) in process_files(list(files_to_process), options):
             if is_success: success_count += 1
             else: error_msgs.append(f"- {os.path.basename(file_path)}:\n  {msg}")
-        
+
         if not error_msgs and success_count > 0:
-            messagebox.showinfo(STRINGS["success_title"], STRINGS["headless_success"].format(count=success_count))
+            show_message(STRINGS["success_title"], STRINGS["headless_success"].format(count=success_count))
         elif error_msgs:
             report = ""
             if success_count > 0: report += f"Successfully processed {success_count} file(s).\n\n"
             report += f"Encountered {len(error_msgs)} error(s):\n" + "\n".join(error_msgs)
-            messagebox.showerror(STRINGS["report_title"], report)
+            show_message(STRINGS["report_title"], report, 'error')
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # required for ProcessPoolExecutor in the PyInstaller build
     try: main()
     except Exception as e:
         log_error(f"A top-level exception occurred: {e}", exc_info=True)
-        messagebox.showerror("Fatal Error", f"A fatal error occurred. Please check 'compressor_log.txt' for details.")
+        show_message("Fatal Error", f"A fatal error occurred. Please check 'compressor_log.txt' for details.", 'error')